@@ -12,11 +12,50 @@
     const artistRow = document.querySelector('.artist-row')
     let lastCover = ''
     let pendingCoverUrl = ''
+    // Matches the initial markup: no src, .empty and the fallback palette.
+    let coverIsEmpty = true
     let isCardVisible = false
     const paletteCanvas = document.createElement('canvas')
     paletteCanvas.width = paletteCanvas.height = 32
     const paletteCtx = paletteCanvas.getContext('2d')
     const PALETTE_PROXY_BASE = 'http://127.0.0.1:65432/palette?url='
+    const CONFIG_URL = 'http://127.0.0.1:65432/config'
+    const DEFAULT_COVER_RECHECK_MS = 5000
+    let wantsDefaultCover = false
+    let defaultCoverVersion = null
+    let defaultCoverTimer = null
+    const PALETTE_CACHE_KEY = 'glowcard.palettes'
+    const PALETTE_CACHE_SIZE = 8
+    let defaultCoverShown = ''
+
+    // Sampled palettes for the last few covers survive browser source reloads,
+    // so a returning cover gets its colours without sampling it again.
+    const readPaletteCache = () => {
+      try {
+        const cached = JSON.parse(localStorage.getItem(PALETTE_CACHE_KEY) || '[]')
+        return Array.isArray(cached) ? cached.filter((entry) => entry && entry.url) : []
+      } catch (err) {
+        return []
+      }
+    }
+
+    let paletteCache = readPaletteCache()
+
+    const findCachedPalette = (url) => paletteCache.find((entry) => entry.url === url) || null
+
+    const cachePalette = (url, color, brightness) => {
+      const cached = findCachedPalette(url)
+      if (cached && cached.color === color && cached.brightness === brightness) {
+        return
+      }
+      paletteCache = [
+        { url, color, brightness },
+        ...paletteCache.filter((entry) => entry.url !== url),
+      ].slice(0, PALETTE_CACHE_SIZE)
+      try {
+        localStorage.setItem(PALETTE_CACHE_KEY, JSON.stringify(paletteCache))
+      } catch (err) {}
+    }
 
     const isProxyCandidate = (value) => {
       if (!value || typeof value !== 'string') {
@@ -120,6 +159,12 @@
       rootStyle.setProperty('--cover-avg-brightness-color', 'rgba(255, 255, 255, 0.35)')
     }
 
+    const applyPalette = (color, brightnessColor) => {
+      coverIsEmpty = false
+      rootStyle.setProperty('--cover-avg-brightness-color', brightnessColor)
+      rootStyle.setProperty('--cover-avg-color', color)
+    }
+
     const applyCoverPalette = (image, url, { proxyTried = false } = {}) => {
       if (!paletteCtx) {
         return
@@ -140,8 +185,11 @@
         }
 
         const brightnessColor = getBrightnessColor(avg)
-        rootStyle.setProperty('--cover-avg-brightness-color', brightnessColor)
-        rootStyle.setProperty('--cover-avg-color', avg.toRgba(0.95))
+        const color = avg.toRgba(0.95)
+        applyPalette(color, brightnessColor)
+        if (url !== defaultCoverShown) {
+          cachePalette(url, color, brightnessColor)
+        }
       } catch (err) {
         if (!proxyTried) {
           const proxyUrl = buildProxySource(url)
@@ -172,12 +220,17 @@
     }
 
     const setCoverEmpty = () => {
+      pendingCoverUrl = ''
+      if (coverIsEmpty) {
+        return
+      }
+      coverIsEmpty = true
       resetCoverHandlers()
       coverEl.removeAttribute('src')
       coverEl.classList.add('empty')
       setCardBackdrop('')
       applyFallbackPalette()
-      pendingCoverUrl = ''
+      lastCover = ''
     }
 
     const samplePaletteFromSource = (src, url, useCrossOrigin, options = {}) => {
@@ -204,7 +257,12 @@
       paletteImage.src = src
     }
 
-    const setCoverSource = (src, url, { canSample = false, useCrossOrigin = false } = {}) => {
+    const setCoverSource = (
+      src,
+      url,
+      { canSample = false, useCrossOrigin = false, paletteKnown = false } = {}
+    ) => {
+      coverIsEmpty = false
       resetCoverHandlers()
       coverEl.onload = () => {
         lastCover = url
@@ -217,7 +275,7 @@
       coverEl.onerror = () => {
         setCoverEmpty()
       }
-      if (canSample && src) {
+      if (canSample && src && !paletteKnown) {
         samplePaletteFromSource(src, url || src, useCrossOrigin)
       }
       coverEl.src = src
@@ -228,13 +286,61 @@
       }
     }
 
-    const updateCover = (url) => {
+    // A playing track without art shows the script's default cover. It is read
+    // from /config rather than the browser source CSS, so changing it in OBS
+    // does not reload this page; /config is re-checked only while it is shown.
+    const checkDefaultCover = () => {
+      fetch(CONFIG_URL, { cache: 'no-store' })
+        .then((response) => (response.ok ? response.json() : null))
+        .then((config) => {
+          if (!wantsDefaultCover || !config || config.version === defaultCoverVersion) {
+            return
+          }
+          defaultCoverVersion = config.version
+          const url = config.defaultCoverUrl || ''
+          if (url) {
+            defaultCoverShown = url
+            pendingCoverUrl = url
+            loadCover(url)
+          } else {
+            setCoverEmpty()
+          }
+        })
+        .catch(() => {})
+    }
+
+    const showDefaultCover = () => {
+      if (wantsDefaultCover) {
+        return
+      }
+      wantsDefaultCover = true
+      defaultCoverVersion = null
+      setCoverEmpty()
+      checkDefaultCover()
+      defaultCoverTimer = setInterval(checkDefaultCover, DEFAULT_COVER_RECHECK_MS)
+    }
+
+    const leaveDefaultCover = () => {
+      if (!wantsDefaultCover) {
+        return
+      }
+      wantsDefaultCover = false
+      clearInterval(defaultCoverTimer)
+      defaultCoverTimer = null
+    }
+
+    const updateCover = (url, playing) => {
       if (!url) {
-        pendingCoverUrl = ''
+        if (playing) {
+          showDefaultCover()
+          return
+        }
+        leaveDefaultCover()
         setCoverEmpty()
         return
       }
 
+      leaveDefaultCover()
       if (url === lastCover || url === pendingCoverUrl) {
         return
       }
@@ -285,7 +391,11 @@
       if (!cardEl) {
         return
       }
-      isCardVisible = Boolean(show)
+      const visible = Boolean(show)
+      if (visible === isCardVisible) {
+        return
+      }
+      isCardVisible = visible
       cardEl.classList.toggle('is-visible', isCardVisible)
       if (!isCardVisible) {
         scrollTracks.forEach((track) => {
@@ -294,18 +404,64 @@
           track.inner?.style?.removeProperty('--scroll-duration')
           track.inner?.style?.removeProperty('--scroll-distance')
         })
+      } else {
+        scheduleScrollUpdate()
       }
     }
 
+    // Marquee tracks are only measured when their text, their size or the card
+    // visibility changes; repeated socket messages never force a layout read.
+    let scrollUpdatePending = false
     const scheduleScrollUpdate = () => {
+      if (scrollUpdatePending) {
+        return
+      }
+      scrollUpdatePending = true
       requestAnimationFrame(() => {
-        requestAnimationFrame(updateScrollState)
+        requestAnimationFrame(() => {
+          scrollUpdatePending = false
+          updateScrollState()
+        })
+      })
+    }
+
+    if (typeof ResizeObserver === 'function') {
+      const resizeObserver = new ResizeObserver(() => {
+        if (isCardVisible) {
+          scheduleScrollUpdate()
+        }
+      })
+      scrollTracks.forEach((track) => {
+        if (track.wrapper) {
+          resizeObserver.observe(track.wrapper)
+        }
+        if (track.main) {
+          resizeObserver.observe(track.main)
+        }
       })
     }
 
     const loadCover = (url) => {
       const useCrossOrigin = url.startsWith('http')
-      setCoverSource(url, url, { canSample: true, useCrossOrigin })
+      const cached = findCachedPalette(url)
+      const paletteKnown = Boolean(cached)
+      if (cached) {
+        applyPalette(cached.color, cached.brightness)
+      }
+      setCoverSource(url, url, { canSample: true, useCrossOrigin, paletteKnown })
+    }
+
+    const rendered = {
+      title: null,
+      artist: null,
+      percent: null,
+    }
+
+    const setTrackText = (main, clone, value) => {
+      main.textContent = value
+      if (clone) {
+        clone.textContent = value
+      }
     }
 
     registerSocket((mediaInfo) => {
@@ -317,24 +473,32 @@
         ? artists.join(', ')
         : mediaInfo.artist || 'N/A'
       const displayTitle = title || 'N/A'
-      titleEl.innerText = displayTitle
-      if (titleCloneEl) {
-        titleCloneEl.innerText = displayTitle
+      let textChanged = false
+      if (displayTitle !== rendered.title) {
+        rendered.title = displayTitle
+        setTrackText(titleEl, titleCloneEl, displayTitle)
+        textChanged = true
       }
-      artistEl.innerText = artistValue
-      if (artistCloneEl) {
-        artistCloneEl.innerText = artistValue
+      if (artistValue !== rendered.artist) {
+        rendered.artist = artistValue
+        setTrackText(artistEl, artistCloneEl, artistValue)
+        textChanged = true
       }
       const rawPercent =
         mediaInfo.position_percent ??
         mediaInfo.positionPercent ??
         0
       const percent = Math.max(0, Math.min(100, Number(rawPercent) || 0))
-      progressEl.style.width = `${percent}%`
-      updateCover(mediaInfo.cover_url || mediaInfo.coverUrl || '')
+      if (percent !== rendered.percent) {
+        rendered.percent = percent
+        progressEl.style.transform = `translateX(${percent - 100}%)`
+      }
       const playing = !!title && isPlayingState(mediaInfo)
+      updateCover(mediaInfo.cover_url || mediaInfo.coverUrl || '', playing)
       setVisibility(playing)
-      scheduleScrollUpdate()
+      if (textChanged && isCardVisible) {
+        scheduleScrollUpdate()
+      }
     })
   }
 
@@ -1,11 +1,17 @@
 """OBS script that merges WebNowPlaying Redux data with a Tuna HTTP feed."""
 
 import asyncio
+from bisect import bisect_right
+from collections import OrderedDict
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from socketserver import ThreadingMixIn
+from queue import Empty, Queue
 from threading import Event, Lock, Thread
 import json
 import mimetypes
+import os
+import re
+import sqlite3
 import time
 import urllib.request
 from urllib.parse import parse_qs, unquote, urlparse
@@ -44,18 +50,31 @@ FALLBACK_COVER_URL = (
     "https://raw.githubusercontent.com/keifufu/WebNowPlaying-Redux-OBS/main/widgets/images/nocover.png"
 )
 PALETTE_PROXY_PORT = 65432
+WARM_START_GRACE_SEC = 10.0
+STATE_SAVE_INTERVAL_SEC = 2.0
+HISTORY_BATCH_MAX = 200
+HISTORY_STOP_GRACE_SEC = 10.0
+LYRICS_CACHE_SIZE = 32
+TRACK_INDEX_SIZE = 64
+COVER_CACHE_SIZE = 16
 
 # Script settings (mutated by OBS)
 selected_widget = "None"
 custom_format = DEFAULT_FORMAT
 default_cover_url = ""
+default_cover_version = 0
 tuna_url = DEFAULT_TUNA_URL
 tuna_poll_ms = DEFAULT_TUNA_POLL_MS
+record_path = ""
+history_enabled = True
+lyrics_dir = ""
 widgets_manifest = []
 
 SCRIPT_DIR = Path(__file__).parent
 LOCAL_WIDGETS_DIR = SCRIPT_DIR / "widgets"
 LOCAL_WIDGETS_MANIFEST = LOCAL_WIDGETS_DIR / "manifest.json"
+STATE_FILE = SCRIPT_DIR / "wnp_tuna_state.json"
+HISTORY_DB = SCRIPT_DIR / "wnp_tuna_history.sqlite3"
 
 # Shared runtime state
 latest_data = {"wnp": None, "tuna": None}
@@ -67,11 +86,37 @@ palette_proxy_thread = None
 last_tuna_track_id = None
 last_tuna_progress_sec = 0.0
 last_tuna_timestamp = 0.0
+recorder_lock = Lock()
+recorder_file = None
+recorder_started = 0.0
+recorder_last = {}
+pending_state = None
+saved_state = None
+state_thread = None
+state_stop = Event()
+warm_start_until = 0.0
+history_queue = Queue()
+history_thread = None
+history_session = 0
+last_played_track_id = None
+last_played_seen = 0.0
+lyrics_cache = OrderedDict()
+lyrics_index = {}
+lyrics_index_mtime = None
+lyrics_track_key = None
+lyrics_timeline = None
+lyrics_line = None
+track_index = OrderedDict()
+cover_lock = Lock()
+cover_aliases = OrderedDict()
+cover_cache = OrderedDict()
 
 _timer_cleanup_done = False
 _tuna_cleanup_done = False
 _palette_cleanup_done = False
 _wnp_cleanup_done = False
+_history_cleanup_done = False
+_state_cleanup_done = False
 _frontend_callback_registered = False
 
 SOURCE_KEY_ALIASES = {
@@ -85,6 +130,14 @@ _OBS_FRONTEND_EVENT_SHUTDOWN = getattr(obs, "OBS_FRONTEND_EVENT_SHUTDOWN", None)
 _OBS_FRONTEND_EXIT_EVENTS = tuple(
     event for event in (_OBS_FRONTEND_EVENT_EXIT, _OBS_FRONTEND_EVENT_SHUTDOWN) if event is not None
 )
+_OBS_FRONTEND_RESTORE_EVENTS = tuple(
+    event
+    for event in (
+        getattr(obs, "OBS_FRONTEND_EVENT_FINISHED_LOADING", None),
+        getattr(obs, "OBS_FRONTEND_EVENT_SCENE_COLLECTION_CHANGED", None),
+    )
+    if event is not None
+)
 
 
 class ThreadedPaletteProxy(ThreadingMixIn, HTTPServer):
@@ -95,12 +148,15 @@ class ThreadedPaletteProxy(ThreadingMixIn, HTTPServer):
 class PaletteProxyHandler(BaseHTTPRequestHandler):
     def do_GET(self):
         parsed = urlparse(self.path)
+        if parsed.path == "/config":
+            self.send_config()
+            return
         if parsed.path != "/palette":
             self.send_error(404)
             return
         query = parse_qs(parsed.query)
         raw_url = query.get("url", [""])[0] if query else ""
-        target_url = unquote(raw_url or "")
+        target_url = resolve_cover_alias(unquote(raw_url or ""))
         if not target_url:
             self.send_error(400)
             return
@@ -109,11 +165,16 @@ class PaletteProxyHandler(BaseHTTPRequestHandler):
         scheme = (parsed_target.scheme or "").lower()
         try:
             if scheme in ("http", "https"):
-                req = urllib.request.Request(target_url, headers={"User-Agent": "Mozilla/5.0"})
-                with urllib.request.urlopen(req, timeout=5) as response:
-                    data = response.read()
-                    info = response.info()
-                    content_type = info.get_content_type() or "application/octet-stream"
+                cached = get_cached_cover(target_url)
+                if cached:
+                    data, content_type = cached
+                else:
+                    req = urllib.request.Request(target_url, headers={"User-Agent": "Mozilla/5.0"})
+                    with urllib.request.urlopen(req, timeout=5) as response:
+                        data = response.read()
+                        info = response.info()
+                        content_type = info.get_content_type() or "application/octet-stream"
+                    store_cached_cover(target_url, data, content_type)
             elif scheme == "file":
                 local_target = parsed_target.path or ""
                 if parsed_target.netloc:
@@ -139,6 +200,17 @@ class PaletteProxyHandler(BaseHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(data)
 
+    def send_config(self):
+        config = {"defaultCoverUrl": default_cover_url or FALLBACK_COVER_URL, "version": default_cover_version}
+        data = json.dumps(config).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(data)
+
     def log_message(self, format, *args):
         pass
 
@@ -178,12 +250,17 @@ def stop_palette_proxy():
 
 
 def _on_frontend_event(event):
+    if event in _OBS_FRONTEND_RESTORE_EVENTS:
+        restore_render_state()
+        return
     if event in _OBS_FRONTEND_EXIT_EVENTS:
         _remove_widget_source()
         _remove_update_timer()
         _stop_tuna_poller_once()
         _stop_palette_proxy_once()
         _stop_wnp_once()
+        _stop_history_writer_once()
+        _stop_state_writer_once()
         _unregister_frontend_callback()
 
 
@@ -229,6 +306,22 @@ def _stop_wnp_once():
         print(f"WNP_TUNA - ERROR: WNPRedux.stop failed: {exc}")
 
 
+def _stop_history_writer_once():
+    global _history_cleanup_done
+    if _history_cleanup_done:
+        return
+    _history_cleanup_done = True
+    stop_history_writer()
+
+
+def _stop_state_writer_once():
+    global _state_cleanup_done
+    if _state_cleanup_done:
+        return
+    _state_cleanup_done = True
+    stop_state_writer()
+
+
 def _register_frontend_callback():
     global _frontend_callback_registered
     if _frontend_callback_registered:
@@ -285,6 +378,9 @@ def script_defaults(settings):
     obs.obs_data_set_default_string(settings, "default_cover_url", "")
     obs.obs_data_set_default_string(settings, "tuna_url", DEFAULT_TUNA_URL)
     obs.obs_data_set_default_int(settings, "tuna_poll_ms", DEFAULT_TUNA_POLL_MS)
+    obs.obs_data_set_default_string(settings, "record_path", "")
+    obs.obs_data_set_default_bool(settings, "history_enabled", True)
+    obs.obs_data_set_default_string(settings, "lyrics_dir", "")
 
 
 def script_properties():
@@ -323,37 +419,68 @@ def script_properties():
     obs.obs_properties_add_text(props, "default_cover_url", "Default Cover URL", obs.OBS_TEXT_DEFAULT)
     obs.obs_properties_add_text(props, "tuna_url", "Tuna URL", obs.OBS_TEXT_DEFAULT)
     obs.obs_properties_add_int(props, "tuna_poll_ms", "Tuna poll interval (ms)", 100, 5000, 100)
+    obs.obs_properties_add_path(
+        props, "record_path", "Record feeds to", obs.OBS_PATH_FILE_SAVE, "Feed recordings (*.jsonl)", None
+    )
+    obs.obs_properties_add_bool(props, "history_enabled", "Log play history")
+    obs.obs_properties_add_button(props, "export_setlist", "Export Setlist", export_setlist)
+    obs.obs_properties_add_path(props, "lyrics_dir", "Lyrics folder (.lrc)", obs.OBS_PATH_DIRECTORY, None, None)
     return props
 
 
 def script_update(settings):
-    global custom_format, default_cover_url, selected_widget, tuna_url, tuna_poll_ms
+    global custom_format, default_cover_url, selected_widget, tuna_url, tuna_poll_ms, record_path, history_enabled
+    global lyrics_dir, default_cover_version
     previous_url = tuna_url
     previous_interval = tuna_poll_ms
+    previous_record_path = record_path
 
     selected_widget = obs.obs_data_get_string(settings, "selected_widget") or "None"
     custom_format = obs.obs_data_get_string(settings, "custom_format") or DEFAULT_FORMAT
+    previous_default_cover = default_cover_url
     default_cover_url = obs.obs_data_get_string(settings, "default_cover_url") or ""
+    if default_cover_url != previous_default_cover:
+        # Widgets showing the default cover poll /config and reload it on a new version.
+        default_cover_version += 1
     tuna_url = obs.obs_data_get_string(settings, "tuna_url") or DEFAULT_TUNA_URL
     tuna_poll_ms = max(100, obs.obs_data_get_int(settings, "tuna_poll_ms") or DEFAULT_TUNA_POLL_MS)
+    record_path = (obs.obs_data_get_string(settings, "record_path") or "").strip()
+    history_enabled = obs.obs_data_get_bool(settings, "history_enabled")
+    previous_lyrics_dir = lyrics_dir
+    lyrics_dir = (obs.obs_data_get_string(settings, "lyrics_dir") or "").strip()
 
     update_widget()
     if tuna_url != previous_url or tuna_poll_ms != previous_interval:
         restart_tuna_poller()
+    if record_path != previous_record_path:
+        stop_recorder()
+        start_recorder(record_path)
+    if history_enabled:
+        start_history_writer()
+    else:
+        stop_history_writer()
+    if lyrics_dir != previous_lyrics_dir:
+        reset_lyrics()
 
 
 def script_load(settings):
     global _timer_cleanup_done, _tuna_cleanup_done, _palette_cleanup_done, _wnp_cleanup_done, _widget_removed
+    global _history_cleanup_done, _state_cleanup_done
     _timer_cleanup_done = _tuna_cleanup_done = _palette_cleanup_done = _wnp_cleanup_done = False
+    _history_cleanup_done = _state_cleanup_done = False
     _widget_removed = False
     _unregister_frontend_callback()
 
     def logger(level, message):
         print(f"WNP_TUNA - {level}: {message}")
 
+    restore_render_state()
+    start_state_writer()
     WNPRedux.start(6534, "2.0.0", logger)
     start_tuna_poller()
     start_palette_proxy()
+    if history_enabled:
+        start_history_writer()
     obs.timer_add(update, 250)
     _register_frontend_callback()
 
@@ -366,6 +493,9 @@ def script_unload():
     _stop_tuna_poller_once()
     _stop_palette_proxy_once()
     _stop_wnp_once()
+    _stop_history_writer_once()
+    _stop_state_writer_once()
+    stop_recorder()
     _unregister_frontend_callback()
 
 
@@ -374,26 +504,39 @@ def script_unload():
 # ---------------------------------------------------------------------------
 
 def update():
+    global warm_start_until
     capture_wnp()
     data = pick_active_data()
+    if not data:
+        note_paused_track()
     if data:
+        warm_start_until = 0.0
+        record_play(data)
+        save_render_state(data)
         render_data(data)
+    elif warm_start_until and time.monotonic() < warm_start_until:
+        # Keep the restored snapshot on screen until the feeds have had a chance to report.
+        return
     else:
+        warm_start_until = 0.0
         clear_sources()
 
 
 def capture_wnp():
     if not WNPRedux.is_started:
+        record_feed("wnp", None)
         with data_lock:
             latest_data["wnp"] = None
         return
 
     media = WNPRedux.media_info
     if not media or not media.title:
+        record_feed("wnp", None)
         with data_lock:
             latest_data["wnp"] = None
         return
 
+    record_feed("wnp", snapshot_wnp(media))
     normalized = normalize_wnp(media)
     with data_lock:
         latest_data["wnp"] = normalized
@@ -433,22 +576,29 @@ def run_tuna_poller():
             with urllib.request.urlopen(req, timeout=2) as response:
                 payload = json.loads(response.read().decode())
         except Exception:
-            with data_lock:
-                latest_data["tuna"] = None
-            continue
+            payload = None
+        ingest_tuna(payload)
+
 
-        normalized = normalize_tuna(payload)
-        normalized = adjust_tuna_progress(normalized)
+def ingest_tuna(payload):
+    record_feed("tuna", payload, repeat=True)
+    if payload is None:
         with data_lock:
-            latest_data["tuna"] = normalized
+            latest_data["tuna"] = None
+        return
+
+    normalized = normalize_tuna(payload)
+    normalized = adjust_tuna_progress(normalized)
+    with data_lock:
+        latest_data["tuna"] = normalized
 
 
 def pick_active_data():
     with data_lock:
-        wnp_data = latest_data.get("wnp")
+        wnp_data = link_track(latest_data.get("wnp"))
+        tuna_data = link_track(latest_data.get("tuna"))
         if is_playing(wnp_data):
             return wnp_data
-        tuna_data = latest_data.get("tuna")
         if is_playing(tuna_data):
             return tuna_data
     return None
@@ -465,6 +615,26 @@ def is_playing(info):
     )
 
 
+WNP_SNAPSHOT_FIELDS = (
+    "player_name",
+    "title",
+    "artist",
+    "album",
+    "duration",
+    "position",
+    "position_percent",
+    "cover_url",
+    "cover",
+    "state",
+    "track_url",
+    "url",
+)
+
+
+def snapshot_wnp(media):
+    return {field: getattr(media, field, None) for field in WNP_SNAPSHOT_FIELDS}
+
+
 def normalize_wnp(media):
     duration_sec = parse_time(media.duration)
     position_sec = parse_time(media.position)
@@ -472,6 +642,7 @@ def normalize_wnp(media):
     artist_value = media.artist or ""
     artists = [part.strip() for part in artist_value.replace(" feat.", ",").split(",") if part.strip()]
     return {
+        "source": "wnp",
         "player_name": media.player_name or "WebNowPlaying",
         "title": media.title or "",
         "artist": artist_value,
@@ -483,6 +654,7 @@ def normalize_wnp(media):
         "coverUrl": media.cover_url or getattr(media, "cover", "") or "",
         "status": media.state or "",
         "trackUrl": getattr(media, "track_url", "") or getattr(media, "url", "") or "",
+        "trackKey": make_track_key(media.title, artist_value),
     }
 
 
@@ -508,6 +680,7 @@ def normalize_tuna(payload):
     raw_cover = payload.get("cover_url") or payload.get("cover") or ""
 
     return {
+        "source": "tuna",
         "player_name": str(payload.get("player", "Tuna")),
         "title": title,
         "artist": artist_value,
@@ -519,9 +692,118 @@ def normalize_tuna(payload):
         "coverUrl": normalize_cover_url(raw_cover),
         "status": payload.get("status") or payload.get("state") or "",
         "trackUrl": payload.get("url") or payload.get("track_url") or "",
+        "trackKey": make_track_key(title, artist_value),
     }
 
 
+# ---------------------------------------------------------------------------
+# Cross-source track matching
+# ---------------------------------------------------------------------------
+# The same song seen through WNP and Tuna is linked by a normalized key so each
+# side can borrow the other's album, duration and (when it has none) cover. The
+# palette proxy resolves the WNP cover of a linked track to the Tuna one, so the
+# art is downloaded once. Only "feat."/"ft."/"featuring" credits and remaster
+# suffixes are stripped.
+
+TRACK_KEY_BRACKETS = re.compile(
+    r"\s*[\(\[]\s*(?:feat\.|ft\.|featuring\s)[^\)\]]*[\)\]]"
+    r"|\s*[\(\[][^\)\]]*\bremaster(?:ed)?\b[^\)\]]*[\)\]]",
+    re.IGNORECASE,
+)
+TRACK_KEY_DASH = re.compile(r"\s+-\s+[^-]*\bremaster(?:ed)?\b.*$", re.IGNORECASE)
+TRACK_KEY_FEAT = re.compile(r"\s+(?:feat\.|ft\.|featuring)\s+.*$", re.IGNORECASE)
+TRACK_KEY_ARTIST_SPLIT = re.compile(r"\s*(?:,|&|;)\s*|\s+(?:feat\.|ft\.|featuring)\s+", re.IGNORECASE)
+
+
+def make_track_key(title, artist):
+    title_text = str(title or "")
+    title_text = TRACK_KEY_BRACKETS.sub("", title_text)
+    title_text = TRACK_KEY_DASH.sub("", title_text)
+    title_text = TRACK_KEY_FEAT.sub("", title_text)
+    artist_text = TRACK_KEY_ARTIST_SPLIT.split(str(artist or ""), maxsplit=1)[0]
+    title_key = " ".join(title_text.casefold().split())
+    if not title_key:
+        return None
+    return (title_key, " ".join(artist_text.casefold().split()))
+
+
+def link_track(data):
+    if not data or not data.get("trackKey"):
+        return data
+    key = data["trackKey"]
+    record = track_index.get(key)
+    if record is None:
+        record = {"album": "", "durationSec": 0, "trackUrl": "", "covers": {}}
+        track_index[key] = record
+        if len(track_index) > TRACK_INDEX_SIZE:
+            track_index.popitem(last=False)
+    else:
+        track_index.move_to_end(key)
+
+    for field in ("album", "durationSec", "trackUrl"):
+        if not record[field] and data.get(field):
+            record[field] = data[field]
+
+    # Covers are kept per provider: a feed may replace its own cover for the key
+    # (WNP often reports the new title before the new art), and only borrows the
+    # other provider's cover while it has none of its own.
+    source = data.get("source") or ""
+    covers = record["covers"]
+    cover_url = data.get("coverUrl") or ""
+    if cover_url and covers.get(source) != cover_url:
+        previous = covers.get(source)
+        if previous:
+            remove_cover_alias(previous)
+        covers[source] = cover_url
+    wnp_cover = covers.get("wnp")
+    tuna_cover = covers.get("tuna")
+    if wnp_cover and tuna_cover and wnp_cover != tuna_cover:
+        add_cover_alias(wnp_cover, tuna_cover)
+
+    merged = dict(data)
+    for field in ("album", "durationSec", "trackUrl"):
+        if not merged.get(field):
+            merged[field] = record[field]
+    if not cover_url:
+        merged["coverUrl"] = next((url for provider, url in covers.items() if provider != source and url), "")
+    return merged
+
+
+def add_cover_alias(alias, canonical):
+    with cover_lock:
+        if cover_aliases.get(alias) == canonical:
+            return
+        cover_aliases[alias] = canonical
+        cover_aliases.move_to_end(alias)
+        if len(cover_aliases) > TRACK_INDEX_SIZE:
+            cover_aliases.popitem(last=False)
+
+
+def remove_cover_alias(alias):
+    with cover_lock:
+        cover_aliases.pop(alias, None)
+
+
+def resolve_cover_alias(url):
+    with cover_lock:
+        return cover_aliases.get(url, url)
+
+
+def get_cached_cover(url):
+    with cover_lock:
+        cached = cover_cache.get(url)
+        if cached:
+            cover_cache.move_to_end(url)
+        return cached
+
+
+def store_cached_cover(url, data, content_type):
+    with cover_lock:
+        cover_cache[url] = (data, content_type)
+        if len(cover_cache) > COVER_CACHE_SIZE:
+            cover_cache.popitem(last=False)
+
+
 def _get_tuna_track_identifier(data):
     if not data:
         return None
@@ -618,6 +900,497 @@ def format_mmss(seconds):
     return f"{seconds // 60}:{seconds % 60:02d}"
 
 
+# ---------------------------------------------------------------------------
+# Feed recording
+# ---------------------------------------------------------------------------
+# Recordings are JSON lines of {"t": seconds, "k": "wnp"|"tuna", "d": payload}.
+# Each recorder start appends a {"k": "session", "at": unix time} header and
+# restarts "t" at 0, so one file can hold several OBS sessions.
+# WNP snapshots are written only when they change because capture_wnp reads the
+# current state every tick; Tuna polls are always written (as {"r": 1} when the
+# payload repeats) since adjust_tuna_progress depends on their timing.
+# wnp_tuna_replay.py feeds these files back through the same ingest path.
+
+def start_recorder(path):
+    global recorder_file, recorder_started, recorder_last
+    if not path:
+        return
+    try:
+        handle = open(path, "a", encoding="utf-8")
+    except OSError as exc:
+        print(f"WNP_TUNA - WARN: cannot open feed recording {path}: {exc}")
+        return
+    with recorder_lock:
+        recorder_file = handle
+        recorder_started = time.monotonic()
+        recorder_last = {}
+        _write_recording({"k": "session", "at": round(time.time(), 3)})
+    print(f"WNP_TUNA - INFO: Recording feeds to {path}")
+
+
+def stop_recorder():
+    global recorder_file
+    with recorder_lock:
+        handle = recorder_file
+        recorder_file = None
+    if handle:
+        try:
+            handle.close()
+        except Exception as exc:
+            print(f"WNP_TUNA - WARN: error closing feed recording: {exc}")
+
+
+def record_feed(kind, payload, repeat=False):
+    if recorder_file is None:
+        return
+    with recorder_lock:
+        if recorder_file is None:
+            return
+        entry = {"t": round(time.monotonic() - recorder_started, 3), "k": kind}
+        if kind in recorder_last and recorder_last[kind] == payload:
+            if not repeat:
+                return
+            entry["r"] = 1
+        else:
+            recorder_last[kind] = payload
+            entry["d"] = payload
+        _write_recording(entry)
+
+
+def _write_recording(entry):
+    # Flushed per line so a crash keeps the events leading up to it.
+    try:
+        recorder_file.write(json.dumps(entry, separators=(",", ":"), default=str) + "\n")
+        recorder_file.flush()
+    except Exception as exc:
+        print(f"WNP_TUNA - WARN: feed recording failed: {exc}")
+
+
+# ---------------------------------------------------------------------------
+# Warm-start state
+# ---------------------------------------------------------------------------
+# The last rendered track is kept in STATE_FILE so script_load can put it back
+# into the sources before WNP or Tuna report anything. The OBS tick only hands
+# the playing track to save_render_state; a background thread writes it every
+# STATE_SAVE_INTERVAL_SEC when it changed, so progress stays close to the last
+# frame without a disk write per tick. The N/A placeholder is never saved.
+
+STATE_FIELDS = (
+    "player_name",
+    "title",
+    "artist",
+    "album",
+    "durationSec",
+    "progressSec",
+    "positionPercent",
+    "coverUrl",
+)
+
+
+def save_render_state(data):
+    global pending_state
+    pending_state = data
+
+
+def write_render_state():
+    global saved_state
+    data = pending_state
+    if not data:
+        return
+    state = {field: data.get(field) for field in STATE_FIELDS}
+    if state == saved_state:
+        return
+    temp_path = STATE_FILE.with_name(STATE_FILE.name + ".tmp")
+    try:
+        temp_path.write_text(json.dumps(state, separators=(",", ":")), encoding="utf-8")
+        os.replace(temp_path, STATE_FILE)
+    except OSError as exc:
+        print(f"WNP_TUNA - WARN: cannot save overlay state: {exc}")
+        return
+    saved_state = state
+
+
+def start_state_writer():
+    global state_thread
+    if state_thread and state_thread.is_alive():
+        return
+    state_stop.clear()
+    state_thread = Thread(target=run_state_writer, daemon=True)
+    state_thread.start()
+
+
+def stop_state_writer():
+    global state_thread
+    state_stop.set()
+    if state_thread:
+        try:
+            state_thread.join(timeout=2.0)
+        except Exception as exc:
+            print(f"WNP_TUNA - WARN: error joining state writer thread: {exc}")
+        if state_thread.is_alive():
+            print("WNP_TUNA - WARN: state writer thread still alive after join")
+    state_thread = None
+
+
+def run_state_writer():
+    while not state_stop.wait(STATE_SAVE_INTERVAL_SEC):
+        write_render_state()
+    write_render_state()
+
+
+def load_render_state():
+    try:
+        state = json.loads(STATE_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(state, dict):
+        return None
+    return {field: state.get(field) for field in STATE_FIELDS}
+
+
+def restore_render_state():
+    global saved_state, warm_start_until
+    state = load_render_state()
+    if not state:
+        return
+    with data_lock:
+        if latest_data.get("wnp") or latest_data.get("tuna"):
+            return
+    saved_state = dict(state)
+    warm_start_until = time.monotonic() + WARM_START_GRACE_SEC
+    render_data(state)
+
+
+# ---------------------------------------------------------------------------
+# Play history
+# ---------------------------------------------------------------------------
+# Track transitions are pushed onto history_queue from the OBS tick and written
+# to HISTORY_DB (SQLite, WAL) in batches by a background thread, so the tick
+# never touches the database.
+
+HISTORY_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS plays (
+        id INTEGER PRIMARY KEY,
+        played_at REAL NOT NULL,
+        session INTEGER NOT NULL,
+        source TEXT NOT NULL,
+        player TEXT NOT NULL,
+        title TEXT NOT NULL,
+        artist TEXT NOT NULL,
+        album TEXT NOT NULL,
+        duration_sec REAL NOT NULL,
+        track_url TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS plays_played_at ON plays (played_at)",
+    "CREATE INDEX IF NOT EXISTS plays_session ON plays (session, played_at)",
+)
+HISTORY_COLUMNS = (
+    "played_at",
+    "session",
+    "source",
+    "player",
+    "title",
+    "artist",
+    "album",
+    "duration_sec",
+    "track_url",
+)
+
+
+def open_history_db(path=None):
+    conn = sqlite3.connect(str(path or HISTORY_DB))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    with conn:
+        for statement in HISTORY_SCHEMA:
+            conn.execute(statement)
+    return conn
+
+
+def start_history_writer():
+    global history_thread, history_session
+    if history_thread and history_thread.is_alive():
+        return
+    history_session = int(time.time())
+    history_thread = Thread(target=run_history_writer, args=(HISTORY_DB,), daemon=True)
+    history_thread.start()
+
+
+def stop_history_writer():
+    global history_thread
+    if not history_thread:
+        return
+    if history_thread.is_alive():
+        history_queue.put(None)
+    try:
+        history_thread.join(timeout=3.0)
+    except Exception as exc:
+        print(f"WNP_TUNA - WARN: error joining history writer thread: {exc}")
+    if history_thread.is_alive():
+        print("WNP_TUNA - WARN: history writer thread still alive after join")
+    history_thread = None
+
+
+def run_history_writer(path):
+    try:
+        conn = open_history_db(path)
+    except sqlite3.Error as exc:
+        print(f"WNP_TUNA - WARN: play history disabled: {exc}")
+        return
+    insert = "INSERT INTO plays (%s) VALUES (%s)" % (
+        ", ".join(HISTORY_COLUMNS),
+        ", ".join("?" for _ in HISTORY_COLUMNS),
+    )
+    running = True
+    while running:
+        batch = [history_queue.get()]
+        while len(batch) < HISTORY_BATCH_MAX:
+            try:
+                batch.append(history_queue.get_nowait())
+            except Empty:
+                break
+        rows = [item for item in batch if isinstance(item, tuple)]
+        if rows:
+            try:
+                with conn:
+                    conn.executemany(insert, rows)
+            except sqlite3.Error as exc:
+                print(f"WNP_TUNA - WARN: play history write failed: {exc}")
+        for item in batch:
+            if item is None:
+                running = False
+            elif isinstance(item, Event):
+                item.set()
+    conn.close()
+
+
+def flush_history(timeout=2.0):
+    if not history_thread or not history_thread.is_alive():
+        return False
+    done = Event()
+    history_queue.put(done)
+    return done.wait(timeout)
+
+
+def _history_track_id(data):
+    # trackKey matches the WNP and Tuna versions of one song, so switching
+    # players does not log it twice.
+    return data.get("trackKey") or _get_tuna_track_identifier(data)
+
+
+def note_paused_track():
+    # A paused track is still "seen", so resuming it is not a new play; only a
+    # gap longer than HISTORY_STOP_GRACE_SEC (a real stop) starts a new entry.
+    global last_played_seen
+    if last_played_track_id is None:
+        return
+    with data_lock:
+        feeds = (latest_data.get("wnp"), latest_data.get("tuna"))
+    if any(info and _history_track_id(info) == last_played_track_id for info in feeds):
+        last_played_seen = time.monotonic()
+
+
+def record_play(data):
+    global last_played_track_id, last_played_seen
+    if history_thread is None or not history_thread.is_alive():
+        return
+    now = time.monotonic()
+    track_id = _history_track_id(data)
+    if track_id == last_played_track_id and now - last_played_seen <= HISTORY_STOP_GRACE_SEC:
+        last_played_seen = now
+        return
+    last_played_track_id = track_id
+    last_played_seen = now
+    history_queue.put_nowait(
+        (
+            time.time(),
+            history_session,
+            data.get("source") or "",
+            data.get("player_name") or "",
+            data.get("title") or "",
+            data.get("artist") or "",
+            data.get("album") or "",
+            float(data.get("durationSec") or 0),
+            data.get("trackUrl") or "",
+        )
+    )
+
+
+def query_history(start=None, end=None, session=None, path=None):
+    clauses = []
+    params = []
+    if start is not None:
+        clauses.append("played_at >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("played_at < ?")
+        params.append(end)
+    if session is not None:
+        clauses.append("session = ?")
+        params.append(session)
+    sql = "SELECT %s FROM plays" % ", ".join(HISTORY_COLUMNS)
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY played_at"
+    # Reads only need a plain read-only connection; the writer owns the schema.
+    conn = sqlite3.connect(Path(path or HISTORY_DB).resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        return [dict(zip(HISTORY_COLUMNS, row)) for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+
+def format_setlist(rows):
+    if not rows:
+        return ""
+    started = rows[0]["played_at"]
+    lines = []
+    for row in rows:
+        offset = int(row["played_at"] - started)
+        stamp = f"{offset // 3600}:{offset % 3600 // 60:02d}:{offset % 60:02d}"
+        lines.append(f"{stamp} {row['artist']} - {row['title']}")
+    return "\n".join(lines) + "\n"
+
+
+def export_setlist(*_args):
+    if not history_session:
+        print("WNP_TUNA - INFO: Play history is not running; nothing to export")
+        return
+    flush_history()
+    try:
+        rows = query_history(session=history_session)
+    except sqlite3.Error as exc:
+        print(f"WNP_TUNA - WARN: cannot read play history: {exc}")
+        return
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(history_session))
+    target = SCRIPT_DIR / f"setlist-{stamp}.txt"
+    try:
+        target.write_text(format_setlist(rows), encoding="utf-8")
+    except OSError as exc:
+        print(f"WNP_TUNA - WARN: cannot write setlist: {exc}")
+        return
+    print(f"WNP_TUNA - INFO: Exported {len(rows)} tracks to {target}")
+
+
+# ---------------------------------------------------------------------------
+# Synced lyrics
+# ---------------------------------------------------------------------------
+# "<artist> - <title>.lrc" or "<title>.lrc" files in lyrics_dir are parsed once
+# per track into sorted timestamps; each tick bisects progressSec into them and
+# WNP-Lyrics is only updated when the active line changes.
+
+LRC_TAG = re.compile(r"\[(\d+):(\d+(?:[.:]\d+)?)\]")
+LRC_OFFSET = re.compile(r"^\[offset:\s*([+-]?\d+)\s*\]", re.IGNORECASE)
+
+
+def parse_lrc(text):
+    offset = 0.0
+    entries = []
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        offset_match = LRC_OFFSET.match(line)
+        if offset_match:
+            offset = int(offset_match.group(1)) / 1000
+            continue
+        stamps = []
+        position = 0
+        while True:
+            match = LRC_TAG.match(line, position)
+            if not match:
+                break
+            stamps.append(int(match.group(1)) * 60 + float(match.group(2).replace(":", ".")))
+            position = match.end()
+        if not stamps:
+            continue
+        lyric = line[position:].strip()
+        entries.extend((stamp, lyric) for stamp in stamps)
+    if not entries:
+        return None
+    entries.sort(key=lambda entry: entry[0])
+    # A positive offset shows lyrics earlier.
+    return [stamp - offset for stamp, _ in entries], [lyric for _, lyric in entries]
+
+
+def _lyrics_key(text):
+    return " ".join(str(text or "").casefold().split())
+
+
+def refresh_lyrics_index():
+    global lyrics_index, lyrics_index_mtime
+    folder = Path(lyrics_dir)
+    try:
+        mtime = folder.stat().st_mtime
+    except OSError:
+        lyrics_index = {}
+        lyrics_index_mtime = None
+        return
+    if mtime != lyrics_index_mtime:
+        lyrics_index = {_lyrics_key(path.stem): path for path in folder.glob("*.lrc")}
+        lyrics_index_mtime = mtime
+
+
+def find_lyrics_file(title, artist):
+    artists = [artist] + [part.strip() for part in artist.split(",")[:1]]
+    candidates = [f"{name} - {title}" for name in artists if name] + [title]
+    for candidate in candidates:
+        path = lyrics_index.get(_lyrics_key(candidate))
+        if path:
+            return path
+    return None
+
+
+def load_lyrics(title, artist):
+    # Cache entries are (timeline, folder mtime). A miss only holds while the
+    # folder is unchanged, so a newly added .lrc is picked up on the next play.
+    refresh_lyrics_index()
+    key = (_lyrics_key(title), _lyrics_key(artist))
+    cached = lyrics_cache.get(key)
+    if cached and (cached[0] is not None or cached[1] == lyrics_index_mtime):
+        lyrics_cache.move_to_end(key)
+        return cached[0]
+    timeline = None
+    path = find_lyrics_file(title, artist)
+    if path:
+        try:
+            timeline = parse_lrc(path.read_text(encoding="utf-8-sig", errors="replace"))
+        except OSError as exc:
+            print(f"WNP_TUNA - WARN: cannot read lyrics {path}: {exc}")
+    lyrics_cache[key] = (timeline, lyrics_index_mtime)
+    lyrics_cache.move_to_end(key)
+    if len(lyrics_cache) > LYRICS_CACHE_SIZE:
+        lyrics_cache.popitem(last=False)
+    return timeline
+
+
+def reset_lyrics():
+    global lyrics_index_mtime, lyrics_track_key
+    lyrics_cache.clear()
+    lyrics_index.clear()
+    lyrics_index_mtime = None
+    lyrics_track_key = None
+
+
+def update_lyrics(data):
+    global lyrics_track_key, lyrics_timeline, lyrics_line
+    title = data.get("title") or ""
+    artist = data.get("artist") or ""
+    track_key = (title, artist)
+    if track_key != lyrics_track_key:
+        lyrics_track_key = track_key
+        lyrics_timeline = load_lyrics(title, artist) if lyrics_dir and title and title != "N/A" else None
+        lyrics_line = None
+
+    index = -1
+    if lyrics_timeline:
+        index = bisect_right(lyrics_timeline[0], data.get("progressSec") or 0) - 1
+    if index == lyrics_line:
+        return
+    lyrics_line = index
+    update_source("Lyrics", "text", lyrics_timeline[1][index] if index >= 0 else "")
+
+
 # ---------------------------------------------------------------------------
 # OBS source management
 # ---------------------------------------------------------------------------
@@ -633,6 +1406,7 @@ def render_data(data):
     percent = data.get("positionPercent", "0")
     cover_url = data.get("coverUrl") or default_cover_url or FALLBACK_COVER_URL
 
+    update_lyrics(data)
     update_source(["Player", "PlayerName"], "text", player_name)
     update_source("Title", "text", title)
     update_source("Artist", "text", artist)
@@ -679,6 +1453,7 @@ def create_sources(*_args):
         "Album": "",
         "Duration": "0:00",
         "Position": "0:00",
+        "Lyrics": "",
         "Formatted": custom_format.format(
             player_name="N/A",
             title="N/A",
@@ -760,6 +1535,39 @@ def build_widget_url(entry, fallback_name):
     return f"https://raw.githack.com/keifufu/WebNowPlaying-Redux-OBS/main/widgets/{fallback_name}.html"
 
 
+WIDGET_BASE_CSS = "body { background-color: rgba(0, 0, 0, 0); margin: 0 auto; overflow: hidden; }"
+
+
+def build_widget_css(entry):
+    # Widgets that read /config from the palette proxy pick up the default cover
+    # live, so it stays out of their CSS and changing it never reloads the page.
+    if entry.get("live_config"):
+        return WIDGET_BASE_CSS
+    return WIDGET_BASE_CSS + " :root { --default-cover-url: url(\"%s\"); }" % (
+        default_cover_url or FALLBACK_COVER_URL
+    )
+
+
+def get_browser_settings(source):
+    settings = obs.obs_source_get_settings(source)
+    try:
+        return {
+            "url": obs.obs_data_get_string(settings, "url"),
+            "width": obs.obs_data_get_int(settings, "width"),
+            "height": obs.obs_data_get_int(settings, "height"),
+            "css": obs.obs_data_get_string(settings, "css"),
+        }
+    finally:
+        obs.obs_data_release(settings)
+
+
+def apply_browser_settings(settings, desired):
+    obs.obs_data_set_string(settings, "url", desired["url"])
+    obs.obs_data_set_int(settings, "width", desired["width"])
+    obs.obs_data_set_int(settings, "height", desired["height"])
+    obs.obs_data_set_string(settings, "css", desired["css"])
+
+
 def update_widget():
     source = obs.obs_get_source_by_name("WNP-Widget")
     if selected_widget == "None":
@@ -770,34 +1578,37 @@ def update_widget():
 
     entry = get_widget_entry(selected_widget)
     if entry is None:
+        if source:
+            obs.obs_source_release(source)
         return
 
-    width = entry.get("width", 0)
-    height = entry.get("height", 0)
-    url = entry.get("url") or build_widget_url(entry, selected_widget)
-    css = (
-        "body { background-color: rgba(0, 0, 0, 0); margin: 0 auto; overflow: hidden; } "
-        + ":root { --default-cover-url: url(\"%s\"); }"
-    ) % (default_cover_url or FALLBACK_COVER_URL)
+    desired = {
+        "url": entry.get("url") or build_widget_url(entry, selected_widget),
+        "width": int(entry.get("width", 0)),
+        "height": int(entry.get("height", 0)),
+        "css": build_widget_css(entry),
+    }
 
     if source is None:
         current_scene = obs.obs_frontend_get_current_scene()
         scene = obs.obs_scene_from_source(current_scene)
         settings = obs.obs_data_create()
-        obs.obs_data_set_string(settings, "url", url)
-        obs.obs_data_set_int(settings, "width", width)
-        obs.obs_data_set_int(settings, "height", height)
-        obs.obs_data_set_string(settings, "css", css)
+        apply_browser_settings(settings, desired)
         source = obs.obs_source_create("browser_source", "WNP-Widget", settings, None)
         obs.obs_scene_add(scene, source)
         obs.obs_scene_release(scene)
         obs.obs_data_release(settings)
-    else:
+        obs.obs_source_release(source)
+        return
+
+    try:
+        # Any browser source update recreates the CEF page, so only push settings
+        # that actually differ from what the source already has.
+        if get_browser_settings(source) == desired:
+            return
         settings = obs.obs_data_create()
-        obs.obs_data_set_string(settings, "url", url)
-        obs.obs_data_set_int(settings, "width", width)
-        obs.obs_data_set_int(settings, "height", height)
-        obs.obs_data_set_string(settings, "css", css)
+        apply_browser_settings(settings, desired)
         obs.obs_source_update(source, settings)
         obs.obs_data_release(settings)
+    finally:
         obs.obs_source_release(source)
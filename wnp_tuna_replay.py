@@ -0,0 +1,204 @@
+"""Replays feed recordings from wnp_tuna_overlay.py against stub OBS/pywnp modules.
+
+Recordings are made with the "Record feeds to" script setting. The replayer loads
+the real overlay script, feeds the recorded WNP snapshots and Tuna payloads back
+through capture_wnp/ingest_tuna on a virtual clock, runs the same 250 ms update
+tick OBS would, and writes every obs_source_update call as a JSON line so the
+output of two script versions can be diffed.
+
+    python wnp_tuna_replay.py session.jsonl --speed 100 --output updates.jsonl
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import types
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+DEFAULT_TICK_MS = 250
+
+
+class VirtualClock:
+    def __init__(self, speed):
+        self.now = 0.0
+        self.speed = speed
+        self.real_start = time.perf_counter()
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, target):
+        self.now = max(self.now, target)
+        if self.speed <= 0:
+            return
+        delay = self.real_start + self.now / self.speed - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class UpdateWriter:
+    def __init__(self, clock, stream):
+        self.clock = clock
+        self.stream = stream
+        self.count = 0
+
+    def write(self, source, settings):
+        self.count += 1
+        entry = {"t": round(self.clock.now, 3), "s": source, "d": settings}
+        self.stream.write(json.dumps(entry, separators=(",", ":"), sort_keys=True) + "\n")
+
+
+def build_obs_stub(writer):
+    obs = types.ModuleType("obspython")
+
+    def get_source_by_name(name):
+        return name if name.startswith("WNP-") else None
+
+    def data_set(settings, key, value):
+        settings[key] = value
+
+    def data_get(default):
+        return lambda settings, key: settings.get(key, default)
+
+    obs.obs_get_source_by_name = get_source_by_name
+    obs.obs_source_update = lambda source, settings: writer.write(source, dict(settings))
+    obs.obs_source_get_settings = lambda source: {}
+    obs.obs_data_create = dict
+    obs.obs_data_set_string = data_set
+    obs.obs_data_set_int = data_set
+    obs.obs_data_get_string = data_get("")
+    obs.obs_data_get_int = data_get(0)
+
+    # Everything else the script touches (timers, frontend callbacks, scene
+    # helpers) is a no-op during replay.
+    obs.__getattr__ = lambda name: (lambda *args, **kwargs: None)
+    return obs
+
+
+def build_pywnp_stub():
+    pywnp = types.ModuleType("pywnp")
+
+    class WNPRedux:
+        is_started = True
+        media_info = None
+
+        @staticmethod
+        def start(*args, **kwargs):
+            pass
+
+        @staticmethod
+        def stop():
+            pass
+
+    pywnp.WNPRedux = WNPRedux
+    return pywnp
+
+
+def load_overlay(clock, writer, state_dir):
+    sys.modules["obspython"] = build_obs_stub(writer)
+    sys.modules["pywnp"] = build_pywnp_stub()
+    sys.path.insert(0, str(SCRIPT_DIR))
+    import wnp_tuna_overlay as overlay
+
+    # Only the monotonic clock is virtual; wall-clock helpers stay real.
+    overlay.time = types.SimpleNamespace(
+        monotonic=clock.monotonic, time=time.time, strftime=time.strftime, localtime=time.localtime
+    )
+    # Keep the warm-start snapshot away from the real one next to the script.
+    overlay.STATE_FILE = Path(state_dir) / overlay.STATE_FILE.name
+    return overlay
+
+
+def load_sessions(path):
+    """Split a recording on its session headers, keeping file order within each."""
+    sessions = []
+    events = None
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            kind = event.get("k")
+            if kind == "session" or events is None:
+                events = []
+                sessions.append(events)
+            if kind in ("wnp", "tuna"):
+                events.append(event)
+    return [events for events in sessions if events]
+
+
+def replay(sessions, overlay, clock, tick_sec):
+    wnp = sys.modules["pywnp"].WNPRedux
+    next_tick = 0.0
+    ticks = 0
+
+    for events in sessions:
+        # Sessions play back to back; each one's "t" restarts at 0.
+        base = next_tick
+        last_tuna = None
+        wnp.media_info = None
+        for event in events:
+            at = base + float(event.get("t", 0))
+            while next_tick < at:
+                clock.advance(next_tick)
+                overlay.update()
+                ticks += 1
+                next_tick += tick_sec
+            clock.advance(at)
+
+            if event["k"] == "wnp":
+                data = event.get("d")
+                wnp.media_info = types.SimpleNamespace(**data) if data else None
+            else:
+                if not event.get("r"):
+                    last_tuna = event.get("d")
+                overlay.ingest_tuna(last_tuna)
+
+    clock.advance(next_tick)
+    overlay.update()
+    return ticks + 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recording", help="feed recording written by wnp_tuna_overlay.py")
+    parser.add_argument("--speed", type=float, default=0, help="playback speed (1 = real time, 0 = unthrottled)")
+    parser.add_argument("--tick-ms", type=int, default=DEFAULT_TICK_MS, help="update tick interval")
+    parser.add_argument("--format", dest="custom_format", help="override the Formatted source format")
+    parser.add_argument("--output", help="write OBS updates here instead of stdout")
+    args = parser.parse_args(argv)
+
+    sessions = load_sessions(args.recording)
+    stream = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        with tempfile.TemporaryDirectory(prefix="wnp_tuna_replay_") as state_dir:
+            clock = VirtualClock(args.speed)
+            writer = UpdateWriter(clock, stream)
+            overlay = load_overlay(clock, writer, state_dir)
+            if args.custom_format:
+                overlay.custom_format = args.custom_format
+            started = time.perf_counter()
+            ticks = replay(sessions, overlay, clock, max(1, args.tick_ms) / 1000)
+            elapsed = time.perf_counter() - started
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+    print(
+        f"Replayed {sum(len(events) for events in sessions)} events from {len(sessions)} sessions "
+        f"over {clock.now:.1f}s in {elapsed:.2f}s: "
+        f"{ticks} ticks, {writer.count} source updates",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())